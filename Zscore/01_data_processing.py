@@ -12,106 +12,201 @@ Methodology:
 - Z-score normalization: (value - mean) / std within each experiment
 - This enables comparison across different experimental conditions
 - HGVS parsing extracts individual mutations from complex notation
+- Raw files are streamed in record batches; experiment statistics are
+  merged batch by batch (Welford), so memory scales with the heatmap size
 """
 
 import pandas as pd
 import glob
 import os
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from pipeline_utils import NULL_VALUES
 
-def parse_hgvs_pro(hgvs_string):
+def list_raw_files(data_dir="../SPTAN1Data/"):
     """
-    Parse HGVS protein notation to extract individual mutations.
+    List the raw CSV files in the data directory.
     
     Args:
-        hgvs_string (str): HGVS protein notation (e.g., "p.[Val57Gln;Tyr9Pro]")
+        data_dir (str): Path to directory containing CSV files
     
     Returns:
-        list: List of individual mutations
+        list: Paths of the CSV files
     """
-    if pd.isna(hgvs_string) or hgvs_string == 'p.=':
-        return []
+    all_files = glob.glob(os.path.join(data_dir, "*.csv"))
+    
+    if not all_files:
+        raise FileNotFoundError(f"No CSV files found in {data_dir}")
     
-    mutations = hgvs_string.replace('p.[', '').replace(']', '').split(';')
-    return [m.strip() for m in mutations if m.strip()]
+    return all_files
 
-def load_raw_data(data_dir="../SPTAN1Data/"):
+def iter_raw_batches(all_files, block_size=1 << 22):
     """
-    Load all raw CSV files from the data directory.
+    Stream raw CSV files as record batches.
+    
+    Only the hgvs_pro and score columns are parsed, so at most one batch
+    of one file is held in memory at a time.
     
     Args:
-        data_dir (str): Path to directory containing CSV files
+        all_files (list): Paths of the CSV files, from list_raw_files()
+        block_size (int): Approximate batch size in bytes of CSV text
     
-    Returns:
-        pd.DataFrame: Combined dataframe with experiment_id column
+    Yields:
+        pd.DataFrame: Batch with hgvs_pro, score and experiment_id columns
     """
-    all_files = glob.glob(os.path.join(data_dir, "*.csv"))
-    
-    if not all_files:
-        raise FileNotFoundError(f"No CSV files found in {data_dir}")
+    read_options = pacsv.ReadOptions(block_size=block_size)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=['hgvs_pro', 'score'],
+        column_types={'hgvs_pro': pa.string(), 'score': pa.float64()},
+        null_values=NULL_VALUES,
+        strings_can_be_null=True
+    )
     
-    list_of_dfs = []
     for file_path in all_files:
-        df = pd.read_csv(file_path)
-        df['experiment_id'] = os.path.basename(file_path).split('.')[0]
-        list_of_dfs.append(df)
-    
-    combined_df = pd.concat(list_of_dfs, ignore_index=True)
-    print(f"Loaded {len(all_files)} files with {len(combined_df)} total rows")
-    
-    return combined_df
+        experiment_id = os.path.basename(file_path).split('.')[0]
+        with pacsv.open_csv(file_path, read_options=read_options,
+                            convert_options=convert_options) as reader:
+            for batch in reader:
+                df = batch.to_pandas()
+                df['experiment_id'] = experiment_id
+                yield df
+
+def _explode_mutations(df):
+    """Split HGVS notation into one row per individual mutation."""
+    # Vectorized HGVS parsing in Arrow kernels: drop synonymous/missing
+    # notation, strip the "p.[...]" wrapper and split multi-mutant variants on ';'
+    hgvs = df['hgvs_pro']
+    df = df.loc[hgvs.notna() & (hgvs != 'p.=')]
+    notation = pa.array(df['hgvs_pro'], type=pa.string())
+    notation = pc.replace_substring(pc.replace_substring(notation, 'p.[', ''), ']', '')
+    mutation_lists = pc.split_pattern(notation, ';')
+    
+    # Flatten the list<string> column; parent indices give the source row
+    # of each mutation, replacing pandas' object-space explode
+    mutations = pc.utf8_trim_whitespace(pc.list_flatten(mutation_lists))
+    parent_rows = pc.list_parent_indices(mutation_lists)
+    keep = pc.not_equal(mutations, '')
+    mutations, parent_rows = mutations.filter(keep), parent_rows.filter(keep)
+    
+    # Categorical with sorted categories, as astype('category') would build
+    encoded = mutations.dictionary_encode()
+    order = pc.array_sort_indices(encoded.dictionary).to_numpy()
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    
+    df_exploded = df.iloc[parent_rows.to_numpy()].copy()
+    df_exploded['mutation'] = pd.Categorical.from_codes(
+        rank[encoded.indices.to_numpy()],
+        categories=encoded.dictionary.take(order).to_pandas()
+    )
+    return df_exploded
 
-def process_mutations(df):
+def _pivot_mean(mutation, experiment_id, sums, counts=None):
     """
-    Process HGVS notation and explode mutations.
+    Mean-aggregate values into a (mutation x experiment) matrix.
+    
+    Keys are integer-coded and cells are filled with a single bincount
+    scatter instead of a hash-based pivot_table. Rows may carry partial
+    sums, in which case counts gives the number of values behind each.
     
     Args:
-        df (pd.DataFrame): Raw data with hgvs_pro column
+        mutation (pd.Series): Mutation key of each row
+        experiment_id (pd.Series): Experiment key of each row
+        sums (np.ndarray): Value (or partial sum) of each row
+        counts (np.ndarray): Number of values behind each row; 1 if omitted
     
     Returns:
-        pd.DataFrame: Processed data with individual mutations
+        pd.DataFrame: float32 heatmap with sorted mutation index and experiment columns
     """
-    df['mutation_list'] = df['hgvs_pro'].apply(parse_hgvs_pro)
-    df_exploded = df.explode('mutation_list')
-    df_exploded.rename(columns={'mutation_list': 'mutation'}, inplace=True)
-    df_exploded.dropna(subset=['mutation'], inplace=True)
-    
-    print(f"Exploded to {len(df_exploded)} mutation rows")
-    return df_exploded
+    mut_codes, mutations = pd.factorize(mutation, sort=True)
+    exp_codes, experiments = pd.factorize(experiment_id, sort=True)
+    n_mut, n_exp = len(mutations), len(experiments)
+    
+    flat_codes = mut_codes * n_exp + exp_codes
+    cell_sums = np.bincount(flat_codes, weights=sums, minlength=n_mut * n_exp)
+    cell_counts = np.bincount(flat_codes, weights=counts, minlength=n_mut * n_exp)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (cell_sums / cell_counts).reshape(n_mut, n_exp).astype(np.float32)
+    
+    return pd.DataFrame(means,
+                        index=pd.Index(np.asarray(mutations), name='mutation'),
+                        columns=pd.Index(np.asarray(experiments), name='experiment_id'))
 
-def calculate_z_scores(df):
+def stream_experiment_stats(data_dir="../SPTAN1Data/"):
     """
-    Calculate z-scores within each experiment.
+    Accumulate per-experiment score statistics in one streaming pass.
+    
+    Batches are merged with Chan et al.'s parallel form of Welford's
+    algorithm, so the raw data is never materialized as a whole.
     
     Args:
-        df (pd.DataFrame): Data with score and experiment_id columns
+        data_dir (str): Path to directory containing CSV files
     
     Returns:
-        pd.DataFrame: Data with z_score column
+        dict: experiment_id -> (mean, std) of the exploded mutation scores
     """
-    df['z_score'] = df.groupby('experiment_id')['score'].transform(
-        lambda x: (x - x.mean()) / x.std()
-    )
-    
-    print("Calculated z-scores within each experiment")
-    return df
+    all_files = list_raw_files(data_dir)
+    running = {}
+    n_rows = n_mutation_rows = 0
+    
+    for batch in iter_raw_batches(all_files):
+        n_rows += len(batch)
+        scores = _explode_mutations(batch)['score'].dropna().to_numpy()
+        n_mutation_rows += len(scores)
+        if len(scores) == 0:
+            continue
+        
+        experiment_id = batch['experiment_id'].iat[0]
+        n_b, mean_b = len(scores), scores.mean()
+        m2_b = np.square(scores - mean_b).sum()
+        n_a, mean_a, m2_a = running.get(experiment_id, (0, 0.0, 0.0))
+        
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        running[experiment_id] = (n,
+                                  mean_a + delta * n_b / n,
+                                  m2_a + m2_b + delta ** 2 * n_a * n_b / n)
+    
+    print(f"Streamed {len(all_files)} files with {n_rows} total rows")
+    print(f"Exploded to {n_mutation_rows} scored mutation rows")
+    
+    return {experiment_id: (mean, np.sqrt(m2 / (n - 1)) if n > 1 else np.nan)
+            for experiment_id, (n, mean, m2) in running.items()}
 
-def create_heatmap_data(df):
+def stream_heatmap_data(data_dir="../SPTAN1Data/"):
     """
-    Create pivoted heatmap data for visualization.
+    Build the normalized heatmap without holding the raw data in memory.
+    
+    A first pass collects per-experiment mean/std; a second pass z-scores
+    each batch and reduces it to per-cell partial sums, so peak memory is
+    bounded by the number of (mutation, experiment) cells.
     
     Args:
-        df (pd.DataFrame): Data with mutation, experiment_id, and z_score columns
+        data_dir (str): Path to directory containing CSV files
     
     Returns:
         pd.DataFrame: Pivoted heatmap data
     """
-    heatmap_data = df.pivot_table(
-        index='mutation', 
-        columns='experiment_id', 
-        values='z_score', 
-        aggfunc='mean'
-    )
+    experiment_stats = stream_experiment_stats(data_dir)
+    
+    partials = []
+    for batch in iter_raw_batches(list_raw_files(data_dir)):
+        df = _explode_mutations(batch)
+        mean, std = experiment_stats.get(batch['experiment_id'].iat[0], (np.nan, np.nan))
+        df['z_score'] = (df['score'] - mean) / std
+        df = df[df['z_score'].notna()]
+        if df.empty:
+            continue
+        partials.append(df.groupby(['mutation', 'experiment_id'], observed=True, sort=False)['z_score']
+                          .agg(['sum', 'count'])
+                          .reset_index())
+    print("Calculated z-scores within each experiment")
+    
+    cells = pd.concat(partials, ignore_index=True)
+    heatmap_data = _pivot_mean(cells['mutation'].astype(str), cells['experiment_id'],
+                               cells['sum'].to_numpy(), cells['count'].to_numpy(dtype=np.float64))
     
     print(f"Created heatmap data: {heatmap_data.shape}")
     print(f"Coverage: {heatmap_data.count().sum() / heatmap_data.size * 100:.2f}%")
@@ -122,21 +217,12 @@ def main():
     """Main data processing pipeline."""
     print("=== DATA PROCESSING PIPELINE ===")
     
-    # Load raw data
-    df = load_raw_data()
-    
-    # Process mutations
-    df_processed = process_mutations(df)
-    
-    # Calculate z-scores
-    df_scored = calculate_z_scores(df_processed)
-    
-    # Create heatmap data
-    heatmap_data = create_heatmap_data(df_scored)
+    # Stream raw data: per-experiment statistics, then z-scored heatmap cells
+    heatmap_data = stream_heatmap_data()
     
     # Save results
-    heatmap_data.to_csv("normalized_heatmap_data.csv")
-    print("Saved normalized_heatmap_data.csv")
+    heatmap_data.to_parquet("normalized_heatmap_data.parquet", engine='pyarrow', compression='zstd')
+    print("Saved normalized_heatmap_data.parquet")
     
     return heatmap_data
 
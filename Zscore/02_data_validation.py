@@ -16,28 +16,59 @@ Methodology:
 
 import pandas as pd
 import numpy as np
-from sklearn.impute import KNNImputer
+import numba
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.metrics import mean_squared_error, r2_score
+from zscore_numba import nan_euclidean
+from pipeline_utils import nan_moments
 
-def analyze_data_coverage(df):
+def summarize_matrix(df):
+    """
+    Compute the row and column statistics used by the validation steps.
+    
+    The matrix is downcast to float32 and reduced with nan_moments along
+    each axis, replacing the separate count/mean/std calls on the frame.
+    
+    Args:
+        df (pd.DataFrame): Heatmap data (mutations x experiments)
+    
+    Returns:
+        dict: Observed-value mask plus per-row and per-column counts, means and stds
+    """
+    values = df.to_numpy(dtype=np.float32)
+    valid = ~np.isnan(values)
+    row_counts, row_means, row_stds = nan_moments(values, valid, axis=1)
+    col_counts, col_means, col_stds = nan_moments(values, valid, axis=0)
+    
+    return {
+        'valid': valid,
+        'row_counts': row_counts,
+        'row_means': row_means,
+        'row_stds': row_stds,
+        'col_counts': col_counts,
+        'col_means': col_means,
+        'col_stds': col_stds
+    }
+
+def analyze_data_coverage(df, mutation_coverage):
     """
     Analyze data coverage and identify well-covered mutations.
     
     Args:
         df (pd.DataFrame): Normalized heatmap data
+        mutation_coverage (np.ndarray): Number of observed experiments per mutation
     
     Returns:
         tuple: (well_covered_df, coverage_stats)
     """
-    mutation_coverage = df.count(axis=1)
     well_covered_mask = mutation_coverage >= 5
     well_covered_df = df[well_covered_mask]
     
     coverage_stats = {
         'total_mutations': len(df),
         'well_covered_mutations': len(well_covered_df),
-        'total_coverage': df.count().sum() / df.size * 100,
-        'well_covered_coverage': well_covered_df.count().sum() / well_covered_df.size * 100
+        'total_coverage': mutation_coverage.sum() / df.size * 100,
+        'well_covered_coverage': mutation_coverage[well_covered_mask].sum() / well_covered_df.size * 100
     }
     
     print(f"Data Coverage Analysis:")
@@ -48,54 +79,140 @@ def analyze_data_coverage(df):
     
     return well_covered_df, coverage_stats
 
-def validate_knn_imputation(df, n_neighbors_list=[3, 5, 7, 10], n_splits=5):
+def knn_impute_cells(values, distances, n_neighbors, target_mask):
+    """
+    Estimate selected missing cells the way KNNImputer (uniform weights)
+    does, but from a precomputed nan-Euclidean distance matrix.
+    
+    Each target cell takes the mean of its n_neighbors nearest rows that
+    observe the column; rows with no finite distance to any donor fall
+    back to the column mean. Only the target cells are computed, so no
+    full imputed matrix is materialized.
+    
+    Args:
+        values (np.ndarray): Matrix with NaN for missing cells
+        distances (np.ndarray): Pairwise nan-Euclidean distances between rows
+        n_neighbors (int): Number of neighbors for KNN
+        target_mask (np.ndarray): Missing cells to estimate
+    
+    Returns:
+        np.ndarray: Estimates aligned with values[target_mask]
+    """
+    n_cols = values.shape[1]
+    target_cells = np.flatnonzero(target_mask)
+    predictions = np.full(len(target_cells), np.nan)
+    missing = np.isnan(values)
+    
+    for col in range(n_cols):
+        receivers = np.flatnonzero(target_mask[:, col])
+        donors = np.flatnonzero(~missing[:, col])
+        if receivers.size == 0 or donors.size == 0:
+            continue
+        
+        out = np.searchsorted(target_cells, receivers * n_cols + col)
+        donor_values = values[donors, col]
+        dist = distances[np.ix_(receivers, donors)]
+        no_donor = np.isnan(dist).all(axis=1)
+        predictions[out[no_donor]] = donor_values.mean()
+        out, dist = out[~no_donor], dist[~no_donor]
+        if out.size == 0:
+            continue
+        
+        k = min(n_neighbors, donors.size)
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        weights = ~np.isnan(np.take_along_axis(dist, nearest, axis=1))
+        predictions[out] = (donor_values[nearest] * weights).sum(axis=1) / weights.sum(axis=1)
+    
+    return predictions
+
+def _score_split(values, known_mask, split, n_neighbors_list, n_threads):
+    """
+    Hide 20% of the known values for one split and score every neighbor count.
+    
+    Args:
+        values (np.ndarray): Well-covered data
+        known_mask (np.ndarray): Observed-value mask of values
+        split (int): Split index, also the random seed of the hidden mask
+        n_neighbors_list (list): List of neighbor counts to test
+        n_threads (int): Numba threads available to this split
+    
+    Returns:
+        dict: n_neighbors -> (mse, r2), for counts that could be scored
+    """
+    numba.set_num_threads(n_threads)
+    
+    hide_mask = np.random.RandomState(split).random_sample(values.shape) < 0.2
+    hide_mask = hide_mask & known_mask
+    
+    test_values = values.copy()
+    test_values[hide_mask] = np.nan
+    distances = nan_euclidean(test_values)
+    
+    # Hidden cells are a subset of the known ones, so the true values are
+    # never NaN and are the same for every neighbor count
+    true_values = values[hide_mask]
+    
+    scores = {}
+    for n_neighbors in n_neighbors_list:
+        predicted_values = knn_impute_cells(test_values, distances, n_neighbors, hide_mask)
+        
+        # Only cells of a column with no remaining donors stay NaN
+        valid_mask = ~np.isnan(predicted_values)
+        scored_true, scored_predicted = true_values, predicted_values
+        if not valid_mask.all():
+            scored_true, scored_predicted = true_values[valid_mask], predicted_values[valid_mask]
+        if len(scored_true) > 0:
+            mse = mean_squared_error(scored_true, scored_predicted)
+            r2 = r2_score(scored_true, scored_predicted)
+            scores[n_neighbors] = (mse, r2)
+    
+    return scores
+
+def validate_knn_imputation(df, n_neighbors_list=[3, 5, 7, 10], n_splits=5, known_mask=None, n_jobs=-1):
     """
     Validate KNN imputation using cross-validation.
     
+    The nan-Euclidean distance matrix, which dominates KNN cost, depends
+    only on the hidden cells, so it is computed once per split and shared
+    by every neighbor count. Splits are independent and run in parallel
+    worker processes; joblib memory-maps large inputs instead of copying.
+    
     Args:
         df (pd.DataFrame): Well-covered data
         n_neighbors_list (list): List of neighbor counts to test
         n_splits (int): Number of cross-validation splits
+        known_mask (np.ndarray): Observed-value mask of df; computed if omitted
+        n_jobs (int): Number of worker processes (-1 for all cores)
     
     Returns:
         dict: Best parameters and validation results
     """
-    known_mask = ~df.isnull()
-    validation_results = []
+    values = np.ascontiguousarray(df.to_numpy())
+    if known_mask is None:
+        known_mask = ~np.isnan(values)
+    
+    # Split the cores between workers so Numba threads don't oversubscribe
+    n_workers = min(n_splits, effective_n_jobs(n_jobs))
+    n_threads = max(1, numba.config.NUMBA_NUM_THREADS // n_workers)
+    split_scores = Parallel(n_jobs=n_workers)(
+        delayed(_score_split)(values, known_mask, split, n_neighbors_list, n_threads)
+        for split in range(n_splits)
+    )
     
+    mse_scores = {n_neighbors: [] for n_neighbors in n_neighbors_list}
+    r2_scores = {n_neighbors: [] for n_neighbors in n_neighbors_list}
+    for scores in split_scores:
+        for n_neighbors, (mse, r2) in scores.items():
+            mse_scores[n_neighbors].append(mse)
+            r2_scores[n_neighbors].append(r2)
+    
+    validation_results = []
     for n_neighbors in n_neighbors_list:
         print(f"\nTesting KNN with {n_neighbors} neighbors...")
         
-        mse_scores = []
-        r2_scores = []
-        
-        for split in range(n_splits):
-            np.random.seed(split)
-            hide_mask = np.random.random(df.shape) < 0.2
-            hide_mask = hide_mask & known_mask
-            
-            test_data = df.copy()
-            test_data[hide_mask] = np.nan
-            
-            imputer = KNNImputer(n_neighbors=n_neighbors)
-            imputed_data = imputer.fit_transform(test_data)
-            imputed_df = pd.DataFrame(imputed_data, index=df.index, columns=df.columns)
-            
-            true_values = df[hide_mask].values
-            predicted_values = imputed_df[hide_mask].values
-            
-            if len(true_values) > 0:
-                # Remove any NaN values
-                valid_mask = ~(np.isnan(true_values) | np.isnan(predicted_values))
-                if valid_mask.sum() > 0:
-                    mse = mean_squared_error(true_values[valid_mask], predicted_values[valid_mask])
-                    r2 = r2_score(true_values[valid_mask], predicted_values[valid_mask])
-                    mse_scores.append(mse)
-                    r2_scores.append(r2)
-        
-        if mse_scores:
-            avg_mse = np.mean(mse_scores)
-            avg_r2 = np.mean(r2_scores)
+        if mse_scores[n_neighbors]:
+            avg_mse = np.mean(mse_scores[n_neighbors])
+            avg_r2 = np.mean(r2_scores[n_neighbors])
             validation_results.append({
                 'n_neighbors': n_neighbors,
                 'mse': avg_mse,
@@ -109,29 +226,28 @@ def validate_knn_imputation(df, n_neighbors_list=[3, 5, 7, 10], n_splits=5):
     
     return best_result
 
-def analyze_experiment_consistency(df):
+def analyze_experiment_consistency(matrix_stats):
     """
     Analyze consistency between experiments.
     
     Args:
-        df (pd.DataFrame): Well-covered data
+        matrix_stats (dict): Output of summarize_matrix() on the well-covered data
     
     Returns:
         dict: Consistency statistics
     """
-    mean_effects = df.mean(axis=1)
-    std_effects = df.std(axis=1)
+    std_effects = matrix_stats['row_stds']
     consistency_scores = 1 / (1 + std_effects)
     
-    experiment_means = df.mean(axis=0)
-    experiment_stds = df.std(axis=0)
+    experiment_means = matrix_stats['col_means']
+    experiment_stds = matrix_stats['col_stds']
     
     consistency_stats = {
-        'mean_consistency': consistency_scores.mean(),
+        'mean_consistency': np.nanmean(consistency_scores),
         'high_consistency_count': (consistency_scores >= 0.7).sum(),
         'high_consistency_pct': (consistency_scores >= 0.7).sum() / len(consistency_scores) * 100,
-        'experiment_mean_range': (experiment_means.min(), experiment_means.max()),
-        'mean_experiment_std': experiment_stds.mean()
+        'experiment_mean_range': (np.nanmin(experiment_means), np.nanmax(experiment_means)),
+        'mean_experiment_std': np.nanmean(experiment_stds)
     }
     
     print(f"\nExperiment Consistency Analysis:")
@@ -147,16 +263,19 @@ def main():
     print("=== DATA VALIDATION PIPELINE ===")
     
     # Load data
-    df = pd.read_csv('normalized_heatmap_data.csv', index_col=0)
+    df = pd.read_parquet('normalized_heatmap_data.parquet')
     
-    # Analyze coverage
-    well_covered_df, coverage_stats = analyze_data_coverage(df)
+    # Analyze coverage: only the observed counts are needed for the full matrix,
+    # the remaining statistics are computed for the well-covered subset
+    mutation_coverage = (~np.isnan(df.to_numpy())).sum(axis=1)
+    well_covered_df, coverage_stats = analyze_data_coverage(df, mutation_coverage)
+    well_covered_stats = summarize_matrix(well_covered_df)
     
     # Validate KNN imputation
-    best_params = validate_knn_imputation(well_covered_df)
+    best_params = validate_knn_imputation(well_covered_df, known_mask=well_covered_stats['valid'])
     
     # Analyze consistency
-    consistency_stats = analyze_experiment_consistency(well_covered_df)
+    consistency_stats = analyze_experiment_consistency(well_covered_stats)
     
     # Save validation results
     validation_results = {
@@ -17,6 +17,7 @@ import pandas as pd
 import numpy as np
 from sklearn.impute import KNNImputer
 import json
+from pipeline_utils import IMPUTED_MATRIX_FILE, save_imputed_data
 
 def load_validation_results():
     """Load validation results to get best parameters."""
@@ -40,8 +41,9 @@ def perform_knn_imputation(df, n_neighbors=5):
     
     print(f"Imputing {len(well_covered_df)} mutations across {len(well_covered_df.columns)} experiments")
     
+    # KNNImputer preserves float32 input, halving memory traffic
     imputer = KNNImputer(n_neighbors=n_neighbors)
-    imputed_data = imputer.fit_transform(well_covered_df)
+    imputed_data = imputer.fit_transform(well_covered_df.to_numpy(dtype=np.float32))
     imputed_df = pd.DataFrame(imputed_data, 
                              index=well_covered_df.index, 
                              columns=well_covered_df.columns)
@@ -103,7 +105,7 @@ def main():
     print("=== IMPUTATION PIPELINE ===")
     
     # Load data
-    df = pd.read_csv('normalized_heatmap_data.csv', index_col=0)
+    df = pd.read_parquet('normalized_heatmap_data.parquet')
     
     # Load validation results
     validation_results = load_validation_results()
@@ -115,14 +117,15 @@ def main():
     # Validate quality
     quality_metrics = validate_imputation_quality(df, imputed_df)
     
-    # Save results
-    imputed_df.to_csv('imputed_data.csv')
+    # Save results: the float32 matrix as raw .npy, which later steps memory-map
+    # instead of parsing, with its row/column labels in Parquet sidecars
+    save_imputed_data(imputed_df)
     
     # Save quality metrics
     with open('imputation_quality.json', 'w') as f:
-        json.dump(quality_metrics, f, indent=2)
+        json.dump({k: float(v) for k, v in quality_metrics.items()}, f, indent=2)
     
-    print("\nSaved imputed_data.csv and imputation_quality.json")
+    print(f"\nSaved {IMPUTED_MATRIX_FILE} (+ label sidecars) and imputation_quality.json")
     return imputed_df
 
 if __name__ == "__main__":
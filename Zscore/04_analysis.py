@@ -17,6 +17,11 @@ Methodology:
 import pandas as pd
 import numpy as np
 import json
+from zscore_numba import make_row_effect_summary
+from pipeline_utils import top_n, load_imputed_data
+
+EFFECT_BINS = [-1.0, -0.5, 0.5, 1.0]
+EFFECT_LABELS = ['Strong Deleterious', 'Deleterious', 'Neutral', 'Beneficial', 'Strong Beneficial']
 
 def categorize_mutations(df):
     """
@@ -28,16 +33,11 @@ def categorize_mutations(df):
     Returns:
         pd.DataFrame: Data with effect categories
     """
-    mean_effects = df.mean(axis=1)
-    std_effects = df.std(axis=1)
-    
-    # Categorize by effect size
-    effect_categories = pd.cut(mean_effects, 
-                              bins=[-np.inf, -1, -0.5, 0.5, 1, np.inf],
-                              labels=['Strong Deleterious', 'Deleterious', 'Neutral', 'Beneficial', 'Strong Beneficial'])
-    
-    # Calculate consistency
-    consistency_scores = 1 / (1 + std_effects)
+    # One fused pass per row: mean, std, consistency, category, threshold
+    mean_effects, std_effects, consistency_scores, effect_codes, high_consistency = make_row_effect_summary(df.shape[1])(
+        df.to_numpy(dtype=np.float32), np.asarray(EFFECT_BINS), 0.7
+    )
+    effect_categories = pd.Categorical.from_codes(effect_codes, categories=EFFECT_LABELS, ordered=True)
     
     # Create results dataframe
     results_df = pd.DataFrame({
@@ -46,8 +46,8 @@ def categorize_mutations(df):
         'std_effect': std_effects,
         'consistency_score': consistency_scores,
         'effect_category': effect_categories,
-        'high_consistency': consistency_scores >= 0.7
-    })
+        'high_consistency': high_consistency
+    }, index=df.index)
     
     return results_df
 
@@ -63,12 +63,14 @@ def analyze_effect_distribution(results_df):
     """
     category_counts = results_df['effect_category'].value_counts()
     total_mutations = len(results_df)
+    # Ordered category codes: 0-1 deleterious, 2 neutral, 3-4 beneficial, -1 missing
+    effect_codes = results_df['effect_category'].cat.codes.to_numpy()
     
     distribution_stats = {
         'total_mutations': total_mutations,
-        'deleterious_count': (results_df['effect_category'].isin(['Deleterious', 'Strong Deleterious'])).sum(),
-        'neutral_count': (results_df['effect_category'] == 'Neutral').sum(),
-        'beneficial_count': (results_df['effect_category'].isin(['Beneficial', 'Strong Beneficial'])).sum(),
+        'deleterious_count': ((effect_codes >= 0) & (effect_codes <= 1)).sum(),
+        'neutral_count': (effect_codes == 2).sum(),
+        'beneficial_count': (effect_codes >= 3).sum(),
         'high_consistency_count': results_df['high_consistency'].sum(),
         'mean_effect': results_df['mean_effect'].mean(),
         'std_effect': results_df['std_effect'].mean()
@@ -101,16 +103,16 @@ def identify_significant_mutations(results_df, n_top=10):
         dict: Significant mutations
     """
     # Most deleterious
-    most_deleterious = results_df.nsmallest(n_top, 'mean_effect')
+    most_deleterious = results_df.iloc[top_n(results_df['mean_effect'].to_numpy(), n_top, largest=False)]
     
     # Most beneficial
-    most_beneficial = results_df.nlargest(n_top, 'mean_effect')
+    most_beneficial = results_df.iloc[top_n(results_df['mean_effect'].to_numpy(), n_top)]
     
     # Most variable (inconsistent)
-    most_variable = results_df.nlargest(n_top, 'std_effect')
+    most_variable = results_df.iloc[top_n(results_df['std_effect'].to_numpy(), n_top)]
     
     # Most consistent
-    most_consistent = results_df.nlargest(n_top, 'consistency_score')
+    most_consistent = results_df.iloc[top_n(results_df['consistency_score'].to_numpy(), n_top)]
     
     significant_mutations = {
         'most_deleterious': most_deleterious[['mutation', 'mean_effect', 'consistency_score']].to_dict('records'),
@@ -135,7 +137,7 @@ def main():
     print("=== ANALYSIS PIPELINE ===")
     
     # Load imputed data
-    df = pd.read_csv('imputed_data.csv', index_col=0)
+    df = load_imputed_data()
     
     # Categorize mutations
     results_df = categorize_mutations(df)
@@ -147,7 +149,9 @@ def main():
     significant_mutations = identify_significant_mutations(results_df)
     
     # Save results
-    results_df.to_csv('analysis_results.csv')
+    # Arrow IPC keeps dtypes (incl. the ordered category) and loads zero-copy;
+    # feather needs a default index, and the index duplicates 'mutation'
+    results_df.reset_index(drop=True).to_feather('analysis_results.feather')
     
     # Save summary statistics
     def convert_numpy(obj):
@@ -167,7 +171,7 @@ def main():
     with open('analysis_summary.json', 'w') as f:
         json.dump(summary_stats, f, indent=2)
     
-    print("\nSaved analysis_results.csv and analysis_summary.json")
+    print("\nSaved analysis_results.feather and analysis_summary.json")
     return results_df
 
 if __name__ == "__main__":
@@ -11,27 +11,41 @@ Methodology:
 - Effect distribution: Histogram of mean z-scores
 - Consistency analysis: Scatter plot of effect vs consistency
 - Experiment comparison: Error bars showing experiment variability
-- Interactive heatmaps: Plotly-based exploration tools
+- Interactive heatmaps: Plotly-based exploration tools; matrices larger
+  than the plot are rasterized with Datashader when it is installed.
+  Datashader and xarray are optional and not in requirements.txt, so the
+  default install always takes the binned Heatmap path
 """
 
 import pandas as pd
 import numpy as np
+from plot_settings import PNG_PIL_KWARGS  # selects the Agg backend before pyplot loads
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import json
+from pipeline_utils import top_n, load_imputed_data, summarize_imputed_matrix
 
-def create_summary_visualization(df, results_df):
+try:
+    import datashader as ds
+    import datashader.transfer_functions as tf
+    import xarray as xr
+except ImportError:
+    ds = None
+
+def create_summary_visualization(df, results_df, matrix_stats, top_mutations):
     """
     Create comprehensive summary visualization.
     
     Args:
         df (pd.DataFrame): Imputed data
         results_df (pd.DataFrame): Analysis results
+        matrix_stats (dict): Output of summarize_imputed_matrix(df)
+        top_mutations (np.ndarray): Labels of the 20 largest mean effects
     """
-    fig, axes = plt.subplots(2, 3, figsize=(20, 12))
+    fig, axes = plt.subplots(2, 3, figsize=(20, 12), constrained_layout=True)
     fig.suptitle('Variant Effect Analysis: Comprehensive Summary', fontsize=16, fontweight='bold')
     
     # 1. Effect distribution
@@ -46,6 +60,7 @@ def create_summary_visualization(df, results_df):
     
     # 2. Effect categories pie chart
     category_counts = results_df['effect_category'].value_counts()
+    category_counts = category_counts[category_counts > 0]
     colors = ['red', 'orange', 'gray', 'lightgreen', 'green']
     axes[0, 1].pie(category_counts.values, labels=category_counts.index, autopct='%1.1f%%', 
                    colors=colors, startangle=90)
@@ -63,11 +78,11 @@ def create_summary_visualization(df, results_df):
     plt.colorbar(scatter, ax=axes[0, 2], label='Effect Size')
     
     # 4. Heatmap of top mutations
-    top_mutations = results_df.nlargest(20, 'mean_effect').index
     sample_experiments = df.columns[::2]
     heatmap_data = df.loc[top_mutations, sample_experiments]
     
-    im = axes[1, 0].imshow(heatmap_data.values, cmap='RdBu_r', aspect='auto', vmin=-3, vmax=3)
+    im = axes[1, 0].imshow(heatmap_data.values, cmap='RdBu_r', aspect='auto', vmin=-3, vmax=3,
+                           rasterized=True)
     axes[1, 0].set_title('Top 20 Beneficial Mutations')
     axes[1, 0].set_xlabel('Experiments (sample)')
     axes[1, 0].set_ylabel('Mutations')
@@ -76,8 +91,8 @@ def create_summary_visualization(df, results_df):
     plt.colorbar(im, ax=axes[1, 0], label='Z-score')
     
     # 5. Experiment comparison
-    experiment_means = df.mean(axis=0)
-    experiment_stds = df.std(axis=0)
+    experiment_means = matrix_stats['experiment_means']
+    experiment_stds = matrix_stats['experiment_stds']
     
     axes[1, 1].errorbar(range(len(experiment_means)), experiment_means, yerr=experiment_stds, 
                         fmt='o', alpha=0.7, capsize=3, color='purple')
@@ -94,31 +109,140 @@ def create_summary_visualization(df, results_df):
     axes[1, 2].set_title('Consistency Distribution')
     axes[1, 2].legend()
     
-    plt.tight_layout()
-    plt.savefig('comprehensive_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('comprehensive_analysis.png', dpi=300, bbox_inches='tight',
+                pil_kwargs=PNG_PIL_KWARGS)
+    plt.close(fig)
+
+def _block_starts(n, max_bins):
+    """First index of each of the (at most max_bins) consecutive blocks of n items."""
+    return np.linspace(0, n, min(n, max_bins) + 1).astype(int)[:-1]
+
+def _block_nanmean(values, labels, max_bins, axis):
+    """
+    Average consecutive slices of a matrix into at most max_bins blocks.
+    
+    Args:
+        values (np.ndarray): Matrix, NaN for missing
+        labels (pd.Index): Labels along the reduced axis
+        max_bins (int): Maximum number of blocks to keep
+        axis (int): Axis to reduce
+    
+    Returns:
+        tuple: (block means, block labels as "first … last" ranges)
+    """
+    n = values.shape[axis]
+    if n <= max_bins:
+        return values, [str(label) for label in labels]
+    
+    starts = _block_starts(n, max_bins)
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=axis)
+    counts = np.add.reduceat(valid, starts, axis=axis)
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+    
+    ends = np.append(starts[1:], n) - 1
+    block_labels = [f"{labels[start]} … {labels[end]}" if end > start else str(labels[start])
+                    for start, end in zip(starts, ends)]
+    return means, block_labels
+
+def _rasterize_heatmap(values, plot_height, plot_width, limit):
+    """
+    Render a matrix to an RGBA image with Datashader.
+    
+    Cells are mean-aggregated onto the pixel grid and shaded with a
+    diverging colormap centred on zero, so the cost is O(pixels).
+    
+    Args:
+        values (np.ndarray): Matrix (mutations x experiments), NaN for missing
+        plot_height (int): Image height in pixels
+        plot_width (int): Image width in pixels
+        limit (float): Largest absolute z-score, the ends of the colormap
+    
+    Returns:
+        np.ndarray: (plot_height x plot_width x 4) uint8 image, first mutation in row 0
+    """
+    n_rows, n_cols = values.shape
+    grid = xr.DataArray(values, dims=['mutation', 'experiment'],
+                        coords={'mutation': np.arange(n_rows), 'experiment': np.arange(n_cols)})
+    canvas = ds.Canvas(plot_width=plot_width, plot_height=plot_height)
+    agg = canvas.raster(grid, agg='mean')
+    
+    img = tf.shade(agg, cmap=plt.get_cmap('RdBu_r'), how='linear', span=[-limit, limit])
+    # PIL puts the largest y (last mutation) in the top row
+    return np.flipud(np.asarray(img.to_pil()))
+
+def _tick_positions(labels, max_ticks=20):
+    """Evenly spaced cell positions and their labels for at most max_ticks ticks."""
+    positions = np.unique(np.linspace(0, len(labels) - 1, min(len(labels), max_ticks)).astype(int))
+    return positions, [str(labels[position]) for position in positions]
 
-def create_interactive_heatmap(df):
+def create_interactive_heatmap(df, max_rows=600, max_cols=1000):
     """
     Create interactive heatmap for data exploration.
     
     Args:
         df (pd.DataFrame): Imputed data
+        max_rows (int): Mutation bins to keep (about the plot height in pixels)
+        max_cols (int): Experiment bins to keep (about the plot width in pixels)
     """
-    # Sample data for performance
-    sample_mutations = df.index[::10]  # Every 10th mutation
-    sample_experiments = df.columns[::2]  # Every other experiment
-    sample_data = df.loc[sample_mutations, sample_experiments]
-    
-    fig = go.Figure(data=go.Heatmap(
-        z=sample_data.values,
-        x=sample_data.columns,
-        y=sample_data.index,
-        colorscale='RdBu_r',
-        zmid=0,
-        hoverongaps=False,
-        hovertemplate='Mutation: %{y}<br>Experiment: %{x}<br>Z-score: %{z:.3f}<extra></extra>'
-    ))
+    values = df.to_numpy(dtype=np.float32)
+    n_rows, n_cols = values.shape
+    
+    if ds is not None and (n_rows > max_rows or n_cols > max_cols):
+        # Full-resolution matrix: embed one pre-shaded raster the size of the plot
+        # instead of a per-cell trace, stretched over the cell coordinates
+        limit = float(np.nanmax(np.abs(values)))
+        image = _rasterize_heatmap(values, max_rows, max_cols, limit)
+        fig = go.Figure(go.Image(z=image, colormodel='rgba256', hoverinfo='skip',
+                                 x0=-0.5 + n_cols / max_cols / 2, dx=n_cols / max_cols,
+                                 y0=-0.5 + n_rows / max_rows / 2, dy=n_rows / max_rows))
+        
+        # Transparent coarse heatmap on top for hover and the colorbar; each
+        # block sits at the centre of the cells it averages
+        hover_values, mutation_labels = _block_nanmean(values, df.index, max_rows // 10, axis=0)
+        hover_values, experiment_labels = _block_nanmean(hover_values, df.columns, max_cols // 10, axis=1)
+        row_starts, col_starts = _block_starts(n_rows, max_rows // 10), _block_starts(n_cols, max_cols // 10)
+        labels = np.stack(np.broadcast_arrays(np.array(mutation_labels)[:, None],
+                                              np.array(experiment_labels)[None, :]), axis=-1)
+        fig.add_trace(go.Heatmap(
+            z=hover_values,
+            x=(col_starts + np.append(col_starts[1:], n_cols) - 1) / 2,
+            y=(row_starts + np.append(row_starts[1:], n_rows) - 1) / 2,
+            customdata=labels,
+            colorscale='RdBu_r',
+            zmin=-limit,
+            zmax=limit,
+            opacity=0,
+            hoverongaps=False,
+            hovertemplate='Mutation: %{customdata[0]}<br>Experiment: %{customdata[1]}<br>'
+                          'Mean z-score: %{z:.3f}<extra></extra>'
+        ))
+        
+        # Image traces default to square pixels and a reversed y axis
+        tickvals, ticktext = _tick_positions(df.columns)
+        fig.update_xaxes(scaleanchor=False, range=[-0.5, n_cols - 0.5],
+                         tickvals=tickvals, ticktext=ticktext)
+        tickvals, ticktext = _tick_positions(df.index)
+        fig.update_yaxes(scaleanchor=False, autorange=True,
+                         tickvals=tickvals, ticktext=ticktext)
+    else:
+        # Average blocks of neighbouring cells down to the pixel budget instead of
+        # stride sampling, so every value contributes and the JSON payload stays bounded
+        values, mutation_labels = _block_nanmean(values, df.index, max_rows, axis=0)
+        values, experiment_labels = _block_nanmean(values, df.columns, max_cols, axis=1)
+        
+        # SVG heatmap, not Heatmapgl: the gl trace drops categorical axis labels
+        # and smooths the cells, and the cell count is already pixel-bounded
+        fig = go.Figure(data=go.Heatmap(
+            z=values,
+            x=experiment_labels,
+            y=mutation_labels,
+            colorscale='RdBu_r',
+            zmid=0,
+            hoverongaps=False,
+            hovertemplate='Mutation: %{y}<br>Experiment: %{x}<br>Z-score: %{z:.3f}<extra></extra>'
+        ))
     
     fig.update_layout(
         title='Interactive Variant Effect Heatmap',
@@ -131,15 +255,17 @@ def create_interactive_heatmap(df):
     fig.write_html('interactive_heatmap.html')
     print("Created interactive_heatmap.html")
 
-def create_consistency_analysis(df, results_df):
+def create_consistency_analysis(df, results_df, matrix_stats, most_inconsistent):
     """
     Create detailed consistency analysis visualization.
     
     Args:
         df (pd.DataFrame): Imputed data
         results_df (pd.DataFrame): Analysis results
+        matrix_stats (dict): Output of summarize_imputed_matrix(df)
+        most_inconsistent (np.ndarray): Labels of the 20 lowest consistency scores
     """
-    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12), constrained_layout=True)
     fig.suptitle('Consistency Analysis: Methodological Insights', fontsize=16, fontweight='bold')
     
     # 1. Consistency distribution
@@ -152,8 +278,8 @@ def create_consistency_analysis(df, results_df):
     axes[0, 0].legend()
     
     # 2. Experiment variability
-    experiment_means = df.mean(axis=0)
-    experiment_stds = df.std(axis=0)
+    experiment_means = matrix_stats['experiment_means']
+    experiment_stds = matrix_stats['experiment_stds']
     
     axes[0, 1].errorbar(range(len(experiment_means)), experiment_means, yerr=experiment_stds, 
                         fmt='o', alpha=0.7, capsize=3, color='purple')
@@ -163,7 +289,7 @@ def create_consistency_analysis(df, results_df):
     axes[0, 1].axhline(0, color='red', linestyle='--', alpha=0.5)
     
     # 3. Coverage vs consistency
-    mutation_coverage = df.count(axis=1)
+    mutation_coverage = matrix_stats['mutation_coverage']
     axes[1, 0].scatter(mutation_coverage, results_df['consistency_score'], alpha=0.6, s=30, color='purple')
     axes[1, 0].set_xlabel('Number of Experiments')
     axes[1, 0].set_ylabel('Consistency Score')
@@ -172,11 +298,11 @@ def create_consistency_analysis(df, results_df):
     axes[1, 0].legend()
     
     # 4. Most problematic mutations
-    most_inconsistent = results_df.nsmallest(20, 'consistency_score')
     sample_experiments = df.columns[::2]
-    heatmap_data = df.loc[most_inconsistent.index, sample_experiments]
+    heatmap_data = df.loc[most_inconsistent, sample_experiments]
     
-    im = axes[1, 1].imshow(heatmap_data.values, cmap='RdBu_r', aspect='auto', vmin=-3, vmax=3)
+    im = axes[1, 1].imshow(heatmap_data.values, cmap='RdBu_r', aspect='auto', vmin=-3, vmax=3,
+                           rasterized=True)
     axes[1, 1].set_title('Most Inconsistent Mutations')
     axes[1, 1].set_xlabel('Experiments (sample)')
     axes[1, 1].set_ylabel('Mutations')
@@ -184,22 +310,30 @@ def create_consistency_analysis(df, results_df):
     axes[1, 1].set_xticklabels([exp.split('-')[-1] for exp in sample_experiments], rotation=45)
     plt.colorbar(im, ax=axes[1, 1], label='Z-score')
     
-    plt.tight_layout()
-    plt.savefig('consistency_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('consistency_analysis.png', dpi=300, bbox_inches='tight',
+                pil_kwargs=PNG_PIL_KWARGS)
+    plt.close(fig)
 
 def main():
     """Main visualization pipeline."""
     print("=== VISUALIZATION PIPELINE ===")
     
     # Load data
-    df = pd.read_csv('imputed_data.csv', index_col=0)
-    results_df = pd.read_csv('analysis_results.csv', index_col=0)
+    df = load_imputed_data()
+    results_df = pd.read_feather('analysis_results.feather').set_index('mutation')
+    
+    # Shared statistics, computed once for all figures
+    matrix_stats = summarize_imputed_matrix(df)
+    
+    # Top-20 mutation labels, selected once from the raw columns
+    mutations = results_df.index.to_numpy()
+    top_mutations = mutations[top_n(results_df['mean_effect'].to_numpy(), 20)]
+    most_inconsistent = mutations[top_n(results_df['consistency_score'].to_numpy(), 20, largest=False)]
     
     # Create visualizations
-    create_summary_visualization(df, results_df)
+    create_summary_visualization(df, results_df, matrix_stats, top_mutations)
     create_interactive_heatmap(df)
-    create_consistency_analysis(df, results_df)
+    create_consistency_analysis(df, results_df, matrix_stats, most_inconsistent)
     
     print("\nGenerated visualization files:")
     print("- comprehensive_analysis.png")
@@ -17,37 +17,39 @@ Methodology:
 
 import pandas as pd
 import numpy as np
+from plot_settings import PNG_PIL_KWARGS  # selects the Agg backend before pyplot loads
 import matplotlib.pyplot as plt
 import json
+from pipeline_utils import top_n, load_imputed_data, summarize_imputed_matrix
 
-def analyze_integration_challenges(df, results_df):
+def analyze_integration_challenges(results_df, matrix_stats):
     """
     Analyze challenges in MAVE data integration.
     
     Args:
-        df (pd.DataFrame): Imputed data
         results_df (pd.DataFrame): Analysis results
+        matrix_stats (dict): Output of summarize_imputed_matrix() on the imputed data
     
     Returns:
         dict: Integration challenge statistics
     """
     # Calculate consistency metrics
-    consistency_scores = results_df['consistency_score']
-    experiment_means = df.mean(axis=0)
-    experiment_stds = df.std(axis=0)
+    consistency_scores = results_df['consistency_score'].to_numpy()
+    experiment_means = matrix_stats['experiment_means']
+    experiment_stds = matrix_stats['experiment_stds']
     
     # Identify problematic patterns
     high_consistency_pct = (consistency_scores >= 0.7).sum() / len(consistency_scores) * 100
     low_consistency_pct = (consistency_scores < 0.5).sum() / len(consistency_scores) * 100
-    extreme_experiments = (abs(experiment_means) > 1.0).sum()
+    extreme_experiments = (np.abs(experiment_means) > 1.0).sum()
     
     challenges = {
         'high_consistency_pct': high_consistency_pct,
         'low_consistency_pct': low_consistency_pct,
         'extreme_experiments': extreme_experiments,
-        'experiment_mean_range': (experiment_means.min(), experiment_means.max()),
-        'mean_experiment_std': experiment_stds.mean(),
-        'consistency_mean': consistency_scores.mean()
+        'experiment_mean_range': (np.nanmin(experiment_means), np.nanmax(experiment_means)),
+        'mean_experiment_std': np.nanmean(experiment_stds),
+        'consistency_mean': np.nanmean(consistency_scores)
     }
     
     print(f"\nIntegration Challenges:")
@@ -86,7 +88,7 @@ def propose_quality_metrics(challenges):
     
     return quality_metrics
 
-def create_methodological_visualizations(df, results_df, challenges):
+def create_methodological_visualizations(df, results_df, challenges, matrix_stats, most_inconsistent):
     """
     Create visualizations highlighting methodological problems.
     
@@ -94,8 +96,10 @@ def create_methodological_visualizations(df, results_df, challenges):
         df (pd.DataFrame): Imputed data
         results_df (pd.DataFrame): Analysis results
         challenges (dict): Integration challenges
+        matrix_stats (dict): Output of summarize_imputed_matrix(df)
+        most_inconsistent (np.ndarray): Labels of the 20 lowest consistency scores
     """
-    fig, axes = plt.subplots(2, 3, figsize=(20, 12))
+    fig, axes = plt.subplots(2, 3, figsize=(20, 12), constrained_layout=True)
     fig.suptitle('Methodological Issues in MAVE Data Integration', fontsize=16, fontweight='bold')
     
     # 1. Consistency distribution
@@ -112,8 +116,8 @@ def create_methodological_visualizations(df, results_df, challenges):
                     bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
     
     # 2. Experiment bias analysis
-    experiment_means = df.mean(axis=0)
-    experiment_stds = df.std(axis=0)
+    experiment_means = matrix_stats['experiment_means']
+    experiment_stds = matrix_stats['experiment_stds']
     
     axes[0, 1].errorbar(range(len(experiment_means)), experiment_means, yerr=experiment_stds, 
                         fmt='o', alpha=0.7, capsize=3, color='purple')
@@ -137,11 +141,11 @@ def create_methodological_visualizations(df, results_df, challenges):
     plt.colorbar(scatter, ax=axes[0, 2], label='Effect Size')
     
     # 4. Most problematic mutations
-    most_inconsistent = results_df.nsmallest(20, 'consistency_score')
     sample_experiments = df.columns[::2]
-    heatmap_data = df.loc[most_inconsistent.index, sample_experiments]
+    heatmap_data = df.loc[most_inconsistent, sample_experiments]
     
-    im = axes[1, 0].imshow(heatmap_data.values, cmap='RdBu_r', aspect='auto', vmin=-3, vmax=3)
+    im = axes[1, 0].imshow(heatmap_data.values, cmap='RdBu_r', aspect='auto', vmin=-3, vmax=3,
+                           rasterized=True)
     axes[1, 0].set_title('Most Inconsistent Mutations')
     axes[1, 0].set_xlabel('Experiments (sample)')
     axes[1, 0].set_ylabel('Mutations')
@@ -159,7 +163,7 @@ def create_methodological_visualizations(df, results_df, challenges):
                     bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
     
     # 6. Coverage vs consistency
-    mutation_coverage = df.count(axis=1)
+    mutation_coverage = matrix_stats['mutation_coverage']
     axes[1, 2].scatter(mutation_coverage, consistency_scores, alpha=0.6, s=30, color='purple')
     axes[1, 2].set_xlabel('Number of Experiments')
     axes[1, 2].set_ylabel('Consistency Score')
@@ -167,9 +171,9 @@ def create_methodological_visualizations(df, results_df, challenges):
     axes[1, 2].axhline(0.7, color='blue', linestyle='--', alpha=0.5, label='High consistency')
     axes[1, 2].legend()
     
-    plt.tight_layout()
-    plt.savefig('methodological_insights.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('methodological_insights.png', dpi=300, bbox_inches='tight',
+                pil_kwargs=PNG_PIL_KWARGS)
+    plt.close(fig)
 
 def create_methods_paper_outline(challenges, quality_metrics):
     """
@@ -236,17 +240,24 @@ def main():
     print("=== METHODOLOGICAL INSIGHTS PIPELINE ===")
     
     # Load data
-    df = pd.read_csv('imputed_data.csv', index_col=0)
-    results_df = pd.read_csv('analysis_results.csv', index_col=0)
+    df = load_imputed_data()
+    results_df = pd.read_feather('analysis_results.feather').set_index('mutation')
+    
+    # Shared statistics, computed once for the analysis and the figures
+    matrix_stats = summarize_imputed_matrix(df)
     
     # Analyze integration challenges
-    challenges = analyze_integration_challenges(df, results_df)
+    challenges = analyze_integration_challenges(results_df, matrix_stats)
     
     # Propose quality metrics
     quality_metrics = propose_quality_metrics(challenges)
     
+    # Top-20 least consistent mutation labels, selected from the raw column
+    most_inconsistent = results_df.index.to_numpy()[
+        top_n(results_df['consistency_score'].to_numpy(), 20, largest=False)]
+    
     # Create visualizations
-    create_methodological_visualizations(df, results_df, challenges)
+    create_methodological_visualizations(df, results_df, challenges, matrix_stats, most_inconsistent)
     
     # Create methods paper outline
     create_methods_paper_outline(challenges, quality_metrics)
@@ -259,6 +270,8 @@ def main():
             return float(obj)
         elif isinstance(obj, np.ndarray):
             return obj.tolist()
+        elif isinstance(obj, tuple):
+            return [convert_numpy(v) for v in obj]
         return obj
     
     insights = {
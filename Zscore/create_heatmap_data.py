@@ -1,36 +1,50 @@
 import pandas as pd
+import numpy as np
 import glob
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from pipeline_utils import NULL_VALUES
 
 # Create a list of the files to process. Replace this with a glob pattern for all 42 files.
 # For example: all_files = glob.glob(os.path.join("path/to/your/files/", "*.csv"))
 all_files = glob.glob(os.path.join("MaveDBSPTAN1", "*.csv")) # note: not the full path; add the folder containing the csv files into the same directory as this script.
 
-# Create an empty list to store the dataframes
-list_of_dfs = []
-print(list_of_dfs)
-
-# Loop through each file and add an 'experiment_id' column
-for file_path in all_files:
-    df = pd.read_csv(file_path)
+# Read a single CSV with PyArrow's multi-threaded parser and add an 'experiment_id' column.
+# Missing values use pandas' markers, and 'score' is always parsed as a float
+def load_experiment(file_path):
+    convert_options = pacsv.ConvertOptions(column_types={'score': pa.float64()},
+                                           null_values=NULL_VALUES,
+                                           strings_can_be_null=True)
+    table = pacsv.read_csv(file_path, convert_options=convert_options)
     # Extract a unique identifier from the filename to serve as the experiment ID
-    df['experiment_id'] = os.path.basename(file_path).split('.')[0]
-    list_of_dfs.append(df)
-    print(list_of_dfs)
+    experiment_id = os.path.basename(file_path).split('.')[0]
+    return table.append_column('experiment_id', pa.array([experiment_id] * table.num_rows, type=pa.string()))
+
+# Read the files concurrently; parsing releases the GIL, so the threads overlap
+with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+    tables = list(executor.map(load_experiment, all_files))
+print(f"Loaded {len(tables)} files")
+
+# Concatenate all tables (files may have different extra columns) and convert to pandas once
+combined_df = pa.concat_tables(tables, promote_options='permissive').to_pandas()
 
-# Concatenate all dataframes into a single dataframe
-combined_df = pd.concat(list_of_dfs, ignore_index=True)
+# Multi-mutant notation "p.[Val57Gln;Tyr9Pro]"; single mutations such as "p.Ala10Arg" are kept whole
+HGVS_MULTI_PATTERN = re.compile(r'p\.\[(.*)\]')
 
 # Function to parse the hgvs_pro string and return all mutations
 def parse_hgvs_pro(hgvs_string):
-    if pd.isna(hgvs_string) or hgvs_string == 'p.=':
+    if not isinstance(hgvs_string, str) or hgvs_string == 'p.=':
         return []
-    # Remove the 'p.' and surrounding brackets, then split by semicolon
-    mutations = hgvs_string.replace('p.[', '').replace(']', '').split(';')
-    return [m.strip() for m in mutations if m.strip()]
+    # Remove the 'p.' and surrounding brackets in one regex match, then split by semicolon
+    match = HGVS_MULTI_PATTERN.fullmatch(hgvs_string)
+    mutations = (match.group(1) if match else hgvs_string).split(';')
+    return [m for m in (m.strip() for m in mutations) if m]
 
-# Apply the parsing function
-combined_df['mutation_list'] = combined_df['hgvs_pro'].apply(parse_hgvs_pro)
+# Apply the parsing function over the raw object array, skipping Series.apply's per-row overhead
+combined_df['mutation_list'] = [parse_hgvs_pro(hgvs) for hgvs in combined_df['hgvs_pro'].to_numpy()]
 
 # Use .explode() to create a new row for each mutation
 df_exploded = combined_df.explode('mutation_list')
@@ -41,17 +55,43 @@ df_exploded.rename(columns={'mutation_list': 'mutation'}, inplace=True)
 # Drop rows with no mutation info after the explosion
 df_exploded.dropna(subset=['mutation'], inplace=True)
 
-# Calculate the Z-score for the 'score' column, grouped by experiment
-df_exploded['z_score'] = df_exploded.groupby('experiment_id')['score'].transform(lambda x: (x - x.mean()) / x.std())
+# Factorize both string keys once: category dtype stores integer codes (with sorted
+# categories), so the groupby and pivot below reuse them instead of re-hashing strings
+df_exploded['experiment_id'] = df_exploded['experiment_id'].astype('category')
+df_exploded['mutation'] = df_exploded['mutation'].astype('category')
+
+# Calculate the Z-score for the 'score' column, grouped by experiment.
+# The built-in 'mean'/'std' transforms each run as one C pass, instead of calling a Python lambda per group
+score_groups = df_exploded.groupby('experiment_id', observed=True)['score']
+experiment_mean = score_groups.transform('mean').to_numpy()
+experiment_std = score_groups.transform('std').to_numpy()
+df_exploded['z_score'] = (df_exploded['score'].to_numpy() - experiment_mean) / experiment_std
 
 # Pivot the data to get it in the correct format for a heatmap
-# Rows are mutations, columns are experiments, and values are the normalized scores
-heatmap_data = df_exploded.pivot_table(index='mutation', columns='experiment_id', values='z_score', aggfunc='mean')
+# Rows are mutations, columns are experiments, and values are the normalized scores.
+# Mean-aggregate each (mutation, experiment) cell from the category codes with one
+# bincount pass over the observed values, instead of pandas' grouped pivot_table path
+scored = df_exploded[df_exploded['z_score'].notna()]
+mutation_keys = scored['mutation'].cat.remove_unused_categories()
+experiment_keys = scored['experiment_id'].cat.remove_unused_categories()
+mutation_codes, mutations = mutation_keys.cat.codes.to_numpy(np.int64), mutation_keys.cat.categories
+experiment_codes, experiments = experiment_keys.cat.codes.to_numpy(np.int64), experiment_keys.cat.categories
+cell_codes = mutation_codes * len(experiments) + experiment_codes
+n_cells = len(mutations) * len(experiments)
+cell_sums = np.bincount(cell_codes, weights=scored['z_score'].to_numpy(), minlength=n_cells)
+cell_counts = np.bincount(cell_codes, minlength=n_cells)
+with np.errstate(invalid='ignore'):
+    cell_means = (cell_sums / cell_counts).reshape(len(mutations), len(experiments))
+
+# Wrap as a DataFrame only for printing and writing
+heatmap_data = pd.DataFrame(cell_means,
+                            index=pd.Index(mutations, name='mutation'),
+                            columns=pd.Index(experiments, name='experiment_id'))
 
 # Print the resulting DataFrame which is ready for a heatmap
 print("DataFrame for Heatmap (first 5 rows):")
 print(heatmap_data.head())
 
-# Save the data to a CSV file for your use
-heatmap_data.to_csv("normalized_heatmap_data.csv")
-print("\nSaved normalized data to 'normalized_heatmap_data.csv'")
+# Save the data to a Parquet file for your use (columnar binary write, no per-float text formatting)
+heatmap_data.to_parquet("normalized_heatmap_data.parquet", engine='pyarrow', compression='zstd')
+print("\nSaved normalized data to 'normalized_heatmap_data.parquet'")
@@ -0,0 +1,130 @@
+"""
+Pipeline Utilities
+==================
+
+Plain-Python helpers shared by the pipeline steps:
+1. Missing-value markers for reading the raw CSV files
+2. NaN-aware matrix moments and the imputed-matrix figure statistics
+3. Top-n selection over analysis result columns
+4. Writing and memory-mapping the imputed matrix
+
+Methodology:
+- Raw CSVs are read with pandas' default missing-value markers, whichever
+  reader (pandas, PyArrow, Polars) parses them
+- Moments skip missing values (NaN) and use ddof=1, like pandas' std
+- Selections match pandas' nlargest/nsmallest (keep='first') without the
+  full-frame sort
+- The imputed matrix is a raw float32 .npy that later steps memory-map,
+  with its row/column labels in Parquet sidecars
+"""
+
+import numpy as np
+import pandas as pd
+
+# Missing-value markers pandas recognizes by default
+NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+               '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Imputed matrix written by step 3 and read by steps 4-6
+IMPUTED_MATRIX_FILE = 'imputed_data.npy'
+IMPUTED_INDEX_FILE = 'imputed_data.idx.parquet'
+IMPUTED_COLUMNS_FILE = 'imputed_data.cols.parquet'
+IMPUTED_FILES = [IMPUTED_MATRIX_FILE, IMPUTED_INDEX_FILE, IMPUTED_COLUMNS_FILE]
+
+def nan_moments(values, valid, axis):
+    """
+    Count, mean and sample std (ddof=1) of observed values along an axis.
+    
+    Plain NumPy: a few masked passes over the matrix (count, sum, centred
+    sum of squares), each vectorized along the axis.
+    
+    Args:
+        values (np.ndarray): Matrix with NaN for missing cells
+        valid (np.ndarray): Boolean mask of observed cells
+        axis (int): Axis to reduce over
+    
+    Returns:
+        tuple: (counts, means, stds)
+    """
+    counts = valid.sum(axis=axis)
+    filled = np.where(valid, values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = filled.sum(axis=axis, dtype=np.float64) / counts
+        centered = np.where(valid, filled - np.expand_dims(means, axis), 0.0)
+        stds = np.sqrt(np.square(centered).sum(axis=axis) / (counts - 1))
+    stds[counts < 2] = np.nan
+    return counts, means, stds
+
+def summarize_imputed_matrix(df):
+    """
+    Compute the imputed-matrix statistics used by the figure steps.
+    
+    Each figure step computes these once and passes them to all of its plots.
+    
+    Args:
+        df (pd.DataFrame): Imputed data
+    
+    Returns:
+        dict: Per-experiment means and stds (ddof=1) and per-mutation coverage
+    """
+    values = df.to_numpy()
+    valid = ~np.isnan(values)
+    _, experiment_means, experiment_stds = nan_moments(values, valid, axis=0)
+    
+    return {
+        'experiment_means': experiment_means,
+        'experiment_stds': experiment_stds,
+        'mutation_coverage': valid.sum(axis=1)
+    }
+
+def top_n(values, n, largest=True):
+    """
+    Positions of the n largest (or smallest) values, ordered like nlargest/nsmallest.
+    
+    Uses an O(N) np.partition selection and only sorts the n winners;
+    NaN values are never selected and ties keep their original order.
+    
+    Args:
+        values (np.ndarray): Values to rank
+        n (int): Number of positions to return
+        largest (bool): Select the largest values instead of the smallest
+    
+    Returns:
+        np.ndarray: Integer positions into values
+    """
+    candidates = np.flatnonzero(~np.isnan(values))
+    keys = -values[candidates] if largest else values[candidates]
+    n = min(n, len(candidates))
+    if n == 0:
+        return candidates[:0]
+    
+    # Everything strictly past the n-th value, then its first ties (keep='first')
+    kth = np.partition(keys, n - 1)[n - 1]
+    better = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:n - len(better)]
+    selected = np.concatenate([better, ties])
+    selected = selected[np.lexsort((selected, keys[selected]))]
+    return candidates[selected]
+
+def save_imputed_data(imputed_df):
+    """
+    Write the imputed matrix and its labels for the later steps.
+    
+    Args:
+        imputed_df (pd.DataFrame): Imputed data (mutations x experiments)
+    """
+    np.save(IMPUTED_MATRIX_FILE, np.ascontiguousarray(imputed_df.to_numpy(dtype=np.float32)))
+    pd.DataFrame({'mutation': imputed_df.index}).to_parquet(IMPUTED_INDEX_FILE)
+    pd.DataFrame({'experiment_id': imputed_df.columns}).to_parquet(IMPUTED_COLUMNS_FILE)
+
+def load_imputed_data():
+    """
+    Memory-map the imputed matrix written by save_imputed_data().
+    
+    Returns:
+        pd.DataFrame: Imputed data backed by the read-only memory map
+    """
+    values = np.load(IMPUTED_MATRIX_FILE, mmap_mode='r')
+    index = pd.Index(pd.read_parquet(IMPUTED_INDEX_FILE)['mutation'], name='mutation')
+    columns = pd.Index(pd.read_parquet(IMPUTED_COLUMNS_FILE)['experiment_id'], name='experiment_id')
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
@@ -0,0 +1,19 @@
+"""
+Plot Settings
+=============
+
+Matplotlib settings shared by the figure steps:
+1. Headless Agg backend
+2. PNG writer settings for the saved figures
+
+Methodology:
+- Import this module before matplotlib.pyplot, so the backend is chosen
+  before pyplot initialises one
+- Figures are only saved, so no GUI backend is needed
+"""
+
+import matplotlib
+matplotlib.use('Agg')  # figures are only saved; skip GUI backend initialisation
+
+# Pillow PNG settings for the 300 dpi figures: fast zlib level, no extra optimize pass
+PNG_PIL_KWARGS = {'compress_level': 3, 'optimize': False}
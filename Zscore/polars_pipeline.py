@@ -0,0 +1,183 @@
+"""
+Polars Data Processing Pipeline
+==============================
+
+Polars-backed fast path for step 1 (01_data_processing.py):
+1. Lazily scan raw CSV files from SPTAN1Data/
+2. Parse HGVS protein notation
+3. Calculate z-scores within each experiment
+4. Create normalized heatmap data
+
+Methodology:
+- Same rules as 01_data_processing.py; writes the same
+  normalized_heatmap_data.parquet, so steps 2-6 run unchanged
+- Parsing, z-scores and the pivot input are one lazy query, executed by
+  Polars' multi-threaded engine without intermediate DataFrames
+- Z-scores use native mean/std window expressions over experiment_id
+  (ddof=1, like pandas), not Python callbacks
+
+Usage:
+    python polars_pipeline.py [--data-dir ../SPTAN1Data/] [--check]
+
+With --check, nothing is written: both this pipeline and
+01_data_processing.py run on the same raw files and their heatmaps are
+compared with pandas' assert_frame_equal: labels and dtypes exactly,
+values to float32 tolerance, since the two pipelines sum in different orders.
+"""
+
+import argparse
+import glob
+import importlib
+import os
+import numpy as np
+import pandas as pd
+import polars as pl
+from pipeline_utils import NULL_VALUES
+
+def scan_raw_data(data_dir="../SPTAN1Data/"):
+    """
+    Lazily scan all raw CSV files from the data directory.
+    
+    Each file is scanned separately and tagged with its experiment_id, so
+    files with differing extra columns still combine; only hgvs_pro and
+    score are read.
+    
+    Args:
+        data_dir (str): Path to directory containing CSV files
+    
+    Returns:
+        pl.LazyFrame: Combined raw data with experiment_id column
+    """
+    all_files = glob.glob(os.path.join(data_dir, "*.csv"))
+    
+    if not all_files:
+        raise FileNotFoundError(f"No CSV files found in {data_dir}")
+    
+    scans = [
+        pl.scan_csv(file_path, null_values=NULL_VALUES, infer_schema=False)
+          .select(pl.col('hgvs_pro'),
+                  pl.col('score').cast(pl.Float64),
+                  pl.lit(os.path.basename(file_path).split('.')[0]).alias('experiment_id'))
+        for file_path in all_files
+    ]
+    print(f"Scanning {len(all_files)} files")
+    
+    return pl.concat(scans)
+
+def process_mutations(lf):
+    """
+    Parse HGVS notation and explode mutations.
+    
+    Args:
+        lf (pl.LazyFrame): Raw data with hgvs_pro column (e.g., "p.[Val57Gln;Tyr9Pro]")
+    
+    Returns:
+        pl.LazyFrame: Processed data with individual mutations
+    """
+    mutation = (pl.col('hgvs_pro')
+                  .str.replace_all('p.[', '', literal=True)
+                  .str.replace_all(']', '', literal=True)
+                  .str.split(';'))
+    
+    return (lf.filter(pl.col('hgvs_pro').is_not_null() & (pl.col('hgvs_pro') != 'p.='))
+              .with_columns(mutation.alias('mutation'))
+              .explode('mutation')
+              .with_columns(pl.col('mutation').str.strip_chars())
+              .filter(pl.col('mutation') != ''))
+
+def calculate_z_scores(lf):
+    """
+    Calculate z-scores within each experiment.
+    
+    Args:
+        lf (pl.LazyFrame): Data with score and experiment_id columns
+    
+    Returns:
+        pl.LazyFrame: Data with z_score column
+    """
+    score = pl.col('score').fill_nan(None)
+    z_score = (score - score.mean().over('experiment_id')) / score.std().over('experiment_id')
+    
+    return lf.with_columns(z_score.alias('z_score'))
+
+def create_heatmap_data(lf):
+    """
+    Create pivoted heatmap data for visualization.
+    
+    Args:
+        lf (pl.LazyFrame): Data with mutation, experiment_id, and z_score columns
+    
+    Returns:
+        pd.DataFrame: float32 heatmap with sorted mutation index and experiment columns
+    """
+    df = (lf.filter(pl.col('z_score').is_not_null() & pl.col('z_score').is_not_nan())
+            .select('mutation', 'experiment_id', 'z_score')
+            .collect())
+    print(f"Collected {len(df)} z-scored mutation rows")
+    
+    pivoted = (df.pivot(on='experiment_id', index='mutation', values='z_score',
+                        aggregate_function='mean')
+                 .sort('mutation'))
+    experiments = sorted(c for c in pivoted.columns if c != 'mutation')
+    
+    heatmap_data = pd.DataFrame(pivoted.select(experiments).to_numpy().astype(np.float32),
+                                index=pd.Index(pivoted['mutation'].to_numpy(), name='mutation'),
+                                columns=pd.Index(experiments, name='experiment_id'))
+    
+    print(f"Created heatmap data: {heatmap_data.shape}")
+    print(f"Coverage: {heatmap_data.count().sum() / heatmap_data.size * 100:.2f}%")
+    
+    return heatmap_data
+
+def check_against_step1(data_dir="../SPTAN1Data/"):
+    """
+    Check that this pipeline reproduces step 1's heatmap.
+    
+    Labels and dtypes must match exactly. Values are compared with
+    float32-level tolerances: step 1 merges Welford moments and sums with
+    bincount, Polars aggregates in its own order, so the last bits differ.
+    
+    Args:
+        data_dir (str): Path to directory containing CSV files
+    
+    Raises:
+        AssertionError: If the two heatmaps differ in labels, dtype or any value beyond tolerance
+    """
+    step1 = importlib.import_module('01_data_processing')
+    expected = step1.stream_heatmap_data(data_dir)
+    actual = create_heatmap_data(calculate_z_scores(process_mutations(scan_raw_data(data_dir))))
+    
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-5, atol=1e-6)
+    print(f"Polars heatmap matches 01_data_processing.py: {actual.shape}")
+
+def main():
+    """Main Polars data processing pipeline."""
+    parser = argparse.ArgumentParser(description='Polars fast path for step 1')
+    parser.add_argument('--data-dir', default='../SPTAN1Data/',
+                       help='Directory containing the raw CSV files (default: ../SPTAN1Data/)')
+    parser.add_argument('--check', action='store_true',
+                       help='Compare with 01_data_processing.py instead of writing output')
+    
+    args = parser.parse_args()
+    
+    if args.check:
+        print("=== POLARS vs STEP 1 EQUIVALENCE CHECK ===")
+        check_against_step1(args.data_dir)
+        return None
+    
+    print("=== DATA PROCESSING PIPELINE (POLARS) ===")
+    
+    # Build the lazy query: scan, parse, z-score
+    lf = calculate_z_scores(process_mutations(scan_raw_data(args.data_dir)))
+    
+    # Execute and pivot
+    heatmap_data = create_heatmap_data(lf)
+    
+    # Save results
+    heatmap_data.to_parquet("normalized_heatmap_data.parquet", engine='pyarrow', compression='zstd')
+    print("Saved normalized_heatmap_data.parquet")
+    
+    return heatmap_data
+
+if __name__ == "__main__":
+    main()
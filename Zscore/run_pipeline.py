@@ -10,8 +10,15 @@ This script runs the complete variant effect analysis pipeline:
 5. Visualization
 6. Methodological Insights
 
+Steps run in dependency waves: independent steps (e.g. 5 and 6) run in
+parallel worker processes. Step outputs are cached in .cache/, keyed by a hash of the step script
+and its input files; a step whose inputs are unchanged restores its
+outputs from the cache instead of rerunning. Inputs are re-hashed only
+when their size or modification time changes. Only the latest entry of
+each step is kept.
+
 Usage:
-    python run_pipeline.py [--steps 1,2,3,4,5,6] [--cleanup]
+    python run_pipeline.py [--steps 1,2,3,4,5,6] [--cleanup] [--no-cache]
 """
 
 import sys
@@ -19,9 +26,142 @@ import subprocess
 import argparse
 import os
 import glob
+import hashlib
+import shutil
+import io
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from pipeline_utils import IMPUTED_FILES, IMPUTED_MATRIX_FILE
+
+CACHE_DIR = '.cache'
+
+# Input files (glob patterns) and output files of each step
+STEP_FILES = {
+    1: (['../SPTAN1Data/*.csv', 'pipeline_utils.py'],
+        ['normalized_heatmap_data.parquet']),
+    2: (['normalized_heatmap_data.parquet', 'zscore_numba.py', 'pipeline_utils.py'],
+        ['validation_results.json']),
+    3: (['normalized_heatmap_data.parquet', 'validation_results.json', 'pipeline_utils.py'],
+        IMPUTED_FILES + ['imputation_quality.json']),
+    4: (IMPUTED_FILES + ['zscore_numba.py', 'pipeline_utils.py'],
+        ['analysis_results.feather', 'analysis_summary.json']),
+    5: (IMPUTED_FILES + ['analysis_results.feather', 'pipeline_utils.py', 'plot_settings.py'],
+        ['comprehensive_analysis.png', 'interactive_heatmap.html', 'consistency_analysis.png']),
+    6: (IMPUTED_FILES + ['analysis_results.feather', 'pipeline_utils.py', 'plot_settings.py'],
+        ['methodological_insights.png', 'methods_paper_outline.md', 'methodological_insights.json'])
+}
+
+# Steps whose outputs each step reads
+STEP_DEPS = {
+    1: set(),
+    2: {1},
+    3: {1, 2},
+    4: {3},
+    5: {4},
+    6: {4}
+}
+
+def plan_waves(steps_to_run):
+    """
+    Group the requested steps into waves that can run concurrently.
+    
+    A step waits only for the requested steps it depends on; unrequested
+    dependencies are assumed to have their outputs on disk already.
+    
+    Args:
+        steps_to_run (list): Step numbers to run
+    
+    Returns:
+        list: Waves (lists of step numbers) in execution order
+    """
+    pending = list(steps_to_run)
+    waves = []
+    while pending:
+        wave = [step for step in pending if not STEP_DEPS[step] & set(pending)]
+        waves.append(wave)
+        pending = [step for step in pending if step not in wave]
+    return waves
 
-def run_step(step_number, step_name):
-    """Run a specific pipeline step."""
+def step_cache_dir(step_number, script_name):
+    """
+    Locate the cache entry of a step for its current inputs.
+    
+    A (path, size, mtime_ns) key of the inputs is checked first against the
+    one recorded with the last content hash; the files are only read and
+    hashed when that stat key has changed.
+    
+    Args:
+        step_number (int): Pipeline step number
+        script_name (str): Script that runs the step
+    
+    Returns:
+        str: Cache directory named after the step and a content hash of
+            the script and its input files
+    """
+    input_patterns, _ = STEP_FILES[step_number]
+    input_files = [script_name] + sorted(
+        path for pattern in input_patterns for path in glob.glob(pattern))
+    
+    stat_digest = hashlib.sha1()
+    for path in input_files:
+        stat = os.stat(path)
+        stat_digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    stat_key = stat_digest.hexdigest()
+    
+    index_file = os.path.join(CACHE_DIR, f"step{step_number}.statkey")
+    try:
+        with open(index_file) as f:
+            recorded_key, recorded_dir = f.read().split()
+        if recorded_key == stat_key:
+            return recorded_dir
+    except (FileNotFoundError, ValueError):
+        pass
+    
+    digest = hashlib.sha1()
+    for path in input_files:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    cache_dir = os.path.join(CACHE_DIR, f"step{step_number}_{digest.hexdigest()}")
+    
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(index_file, 'w') as f:
+        f.write(f"{stat_key} {cache_dir}\n")
+    return cache_dir
+
+def restore_cached_step(cache_dir, output_files):
+    """Copy cached outputs back into place; False if the entry is incomplete."""
+    cached_files = [os.path.join(cache_dir, file) for file in output_files]
+    log_file = os.path.join(cache_dir, 'stdout.log')
+    if not all(os.path.exists(file) for file in cached_files + [log_file]):
+        return False
+    
+    for file in cached_files:
+        shutil.copy2(file, os.path.basename(file))
+    with open(log_file) as f:
+        print(f.read())
+    print(f"Restored {len(output_files)} outputs from {cache_dir}")
+    return True
+
+def store_cached_step(cache_dir, output_files, stdout):
+    """Save the outputs and log of a successful step run, replacing older entries of the step."""
+    if not all(os.path.exists(file) for file in output_files):
+        return
+    
+    step_prefix = os.path.basename(cache_dir).split('_')[0]
+    for old_dir in glob.glob(os.path.join(CACHE_DIR, f"{step_prefix}_*")):
+        if old_dir != cache_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    for file in output_files:
+        shutil.copy2(file, os.path.join(cache_dir, file))
+    with open(os.path.join(cache_dir, 'stdout.log'), 'w') as f:
+        f.write(stdout)
+
+def run_step(step_number, step_name, use_cache=True):
+    """Run a specific pipeline step, or restore it from the cache."""
     print(f"\n{'='*60}")
     print(f"RUNNING STEP {step_number}: {step_name}")
     print(f"{'='*60}")
@@ -32,10 +172,19 @@ def run_step(step_number, step_name):
         print(f"Error: {script_name} not found!")
         return False
     
+    _, output_files = STEP_FILES[step_number]
+    cache_dir = step_cache_dir(step_number, script_name) if use_cache else None
+    if cache_dir and restore_cached_step(cache_dir, output_files):
+        return True
+    
     try:
+        # Headless backend: steps only save figures, so skip GUI initialisation
         result = subprocess.run([sys.executable, script_name], 
-                              capture_output=True, text=True, check=True)
+                              capture_output=True, text=True, check=True,
+                              env=dict(os.environ, MPLBACKEND='Agg'))
         print(result.stdout)
+        if cache_dir:
+            store_cached_step(cache_dir, output_files, result.stdout)
         if result.stderr:
             print("Warnings/Errors:")
             print(result.stderr)
@@ -46,6 +195,13 @@ def run_step(step_number, step_name):
         print(e.stderr)
         return False
 
+def run_step_logged(step_number, step_name, use_cache=True):
+    """Run a step in a worker process; return (success, its printed log)."""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        success = run_step(step_number, step_name, use_cache)
+    return success, log.getvalue()
+
 def cleanup_old_files():
     """Remove redundant files from previous analyses."""
     print("\nCleaning up old files...")
@@ -68,10 +224,13 @@ def cleanup_old_files():
     
     removed_count = 0
     for file in old_files:
-        if os.path.exists(file):
-            os.remove(file)
-            print(f"Removed: {file}")
-            removed_count += 1
+        # Unlink directly rather than stat first; a missing file is the common case
+        try:
+            os.unlink(file)
+        except FileNotFoundError:
+            continue
+        print(f"Removed: {file}")
+        removed_count += 1
     
     print(f"Removed {removed_count} old files")
 
@@ -82,6 +241,8 @@ def main():
                        help='Comma-separated list of steps to run (default: 1,2,3,4,5,6)')
     parser.add_argument('--cleanup', action='store_true', 
                        help='Clean up old files before running pipeline')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Rerun every step instead of restoring cached outputs')
     
     args = parser.parse_args()
     
@@ -102,21 +263,35 @@ def main():
         6: "Methodological Insights"
     }
     
+    undefined_steps = [s for s in steps_to_run if s not in steps]
+    if undefined_steps:
+        print(f"Error: Step {undefined_steps[0]} not defined!")
+        return
+    
     print("VARIANT EFFECT ANALYSIS PIPELINE")
     print("=" * 60)
     print(f"Running steps: {', '.join([f'{s}: {steps[s]}' for s in steps_to_run])}")
     
-    # Run steps
+    # Run steps wave by wave; steps within a wave are independent
     success_count = 0
-    for step_num in steps_to_run:
-        if step_num in steps:
-            if run_step(step_num, steps[step_num]):
+    for wave in plan_waves(steps_to_run):
+        if len(wave) == 1:
+            results = [(run_step(wave[0], steps[wave[0]], use_cache=not args.no_cache), None)]
+        else:
+            with ProcessPoolExecutor(max_workers=min(os.cpu_count(), len(wave))) as executor:
+                results = list(executor.map(run_step_logged, wave, [steps[s] for s in wave],
+                                            [not args.no_cache] * len(wave)))
+        
+        failed_steps = []
+        for step_num, (success, log) in zip(wave, results):
+            if log is not None:
+                print(log, end='')
+            if success:
                 success_count += 1
             else:
-                print(f"\nStep {step_num} failed! Stopping pipeline.")
-                break
-        else:
-            print(f"Error: Step {step_num} not defined!")
+                failed_steps.append(step_num)
+        if failed_steps:
+            print(f"\nStep {failed_steps[0]} failed! Stopping pipeline.")
             break
     
     # Summary
@@ -128,9 +303,9 @@ def main():
     if success_count == len(steps_to_run):
         print("\n🎉 All steps completed successfully!")
         print("\nGenerated files:")
-        print("- normalized_heatmap_data.csv")
-        print("- imputed_data.csv") 
-        print("- analysis_results.csv")
+        print("- normalized_heatmap_data.parquet")
+        print(f"- {IMPUTED_MATRIX_FILE}")
+        print("- analysis_results.feather")
         print("- comprehensive_analysis.png")
         print("- interactive_heatmap.html")
         print("- methodological_insights.png")
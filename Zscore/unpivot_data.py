@@ -1,22 +1,20 @@
 import pandas as pd
+import numpy as np
 
-# Load the pivoted data
-df_pivoted = pd.read_csv('normalized_heatmap_data.csv')
+# Load the pivoted data ('mutation' is restored as the index)
+df_pivoted = pd.read_parquet('normalized_heatmap_data.parquet')
 
-# The melt function requires the index to be a column, so we'll reset it.
-# The 'mutation' column is often loaded as the index, so we'll treat the first column as such.
-df_pivoted = df_pivoted.rename(columns={df_pivoted.columns[0]: 'mutation'})
-
-# Use pd.melt() to unpivot the DataFrame.
-# 'id_vars' are the columns you want to keep as is (the mutation IDs).
-# 'var_name' is the new column for the old column headers (the experiment IDs).
-# 'value_name' is the new column for the cell values (the Z-scores).
-df_unpivoted = pd.melt(
-    df_pivoted,
-    id_vars=['mutation'],
-    var_name='experiment_id',
-    value_name='z_score'
-)
+# Unpivot straight from the raw arrays instead of pd.melt.
+# Like melt, the rows are ordered experiment by experiment: the mutation IDs are
+# tiled once per experiment, each experiment ID is repeated once per mutation, and
+# the Z-scores are read column by column (Fortran order) from the matrix.
+values = df_pivoted.to_numpy()
+n_mutations, n_experiments = values.shape
+df_unpivoted = pd.DataFrame({
+    'mutation': np.tile(df_pivoted.index.to_numpy(), n_experiments),
+    'experiment_id': np.repeat(df_pivoted.columns.to_numpy(), n_mutations),
+    'z_score': values.ravel(order='F')
+})
 
 # Display a sample of the unpivoted data
 print("Unpivoted DataFrame (first 5 rows):")
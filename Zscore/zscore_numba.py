@@ -0,0 +1,128 @@
+"""
+Numba Kernels
+=============
+
+Compiled numeric kernels shared by the pipeline steps:
+1. Pairwise nan-Euclidean distances for KNN imputation
+2. Per-mutation effect and consistency summaries, specialized per
+   experiment count
+
+Methodology:
+- Missing values (NaN) are skipped, matching pandas and scikit-learn
+- Standard deviations use ddof=1, like pandas' Series.std
+- Generic kernels are cached on disk so each pipeline step compiles them
+  once; specialized kernels compile once per process
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from numba import njit, prange
+
+@njit(parallel=True, cache=True)
+def nan_euclidean(values):
+    """
+    Pairwise nan-Euclidean distances between the rows of a matrix.
+    
+    Uses scikit-learn's definition: squared differences over coordinates
+    present in both rows, scaled by n_features / n_present. Row pairs with
+    no common coordinates get NaN.
+    
+    Args:
+        values (np.ndarray): float32 or float64 matrix (rows x features), NaN for missing
+    
+    Returns:
+        np.ndarray: Symmetric (rows x rows) float64 distance matrix
+    """
+    n_rows, n_features = values.shape
+    distances = np.empty((n_rows, n_rows))
+    
+    for i in prange(n_rows):
+        for j in range(i, n_rows):
+            total = 0.0
+            present = 0
+            for k in range(n_features):
+                a = values[i, k]
+                b = values[j, k]
+                if not (np.isnan(a) or np.isnan(b)):
+                    diff = a - b
+                    total += diff * diff
+                    present += 1
+            if present > 0:
+                dist = np.sqrt(total * n_features / present)
+            else:
+                dist = np.nan
+            distances[i, j] = dist
+            distances[j, i] = dist
+    return distances
+
+@lru_cache(maxsize=None)
+def make_row_effect_summary(n_cols):
+    """
+    Build a per-mutation summary kernel specialized for n_cols experiments.
+    
+    The experiment count is fixed for a pipeline run and small, so it is
+    frozen into the kernel as a compile-time constant: the inner loops get
+    a constant trip count that LLVM can fully unroll. Closures are not
+    cached on disk, so each process compiles once per experiment count.
+    
+    Args:
+        n_cols (int): Number of experiments (matrix columns)
+    
+    Returns:
+        function: row_effect_summary(values, bins, consistency_threshold)
+    """
+    @njit(parallel=True)
+    def row_effect_summary(values, bins, consistency_threshold):
+        """
+        Summarize each mutation (row) of the imputed matrix in a single pass.
+        
+        Args:
+            values (np.ndarray): Matrix (mutations x n_cols), NaN for missing
+            bins (np.ndarray): Ascending effect-category edges (right-closed)
+            consistency_threshold (float): Minimum score for high consistency
+        
+        Returns:
+            tuple: (means, stds, consistency_scores, effect_codes, high_consistency);
+                effect_codes index the bins like np.digitize(right=True), -1 for NaN
+        """
+        if values.shape[1] != n_cols:
+            raise ValueError("values has a different number of columns than the kernel")
+        n_rows = values.shape[0]
+        means = np.empty(n_rows)
+        stds = np.empty(n_rows)
+        consistency = np.empty(n_rows)
+        codes = np.empty(n_rows, dtype=np.int64)
+        high = np.empty(n_rows, dtype=np.bool_)
+        
+        for i in prange(n_rows):
+            total = 0.0
+            count = 0
+            for j in range(n_cols):
+                if not np.isnan(values[i, j]):
+                    total += values[i, j]
+                    count += 1
+            mean = total / count if count > 0 else np.nan
+            
+            sq_dev = 0.0
+            for j in range(n_cols):
+                if not np.isnan(values[i, j]):
+                    diff = values[i, j] - mean
+                    sq_dev += diff * diff
+            std = np.sqrt(sq_dev / (count - 1)) if count > 1 else np.nan
+            
+            if np.isnan(mean):
+                code = -1
+            else:
+                code = 0
+                while code < bins.shape[0] and mean > bins[code]:
+                    code += 1
+            
+            means[i] = mean
+            stds[i] = std
+            consistency[i] = 1.0 / (1.0 + std)
+            codes[i] = code
+            high[i] = consistency[i] >= consistency_threshold
+        return means, stds, consistency, codes, high
+    
+    return row_effect_summary
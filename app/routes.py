@@ -1,4 +1,6 @@
-from flask import Blueprint
+from flask import Blueprint, render_template, request
+
+from .utils import generate_variant_map_json
 
 # Create a blueprint named 'main'
 main = Blueprint("main", __name__)
@@ -10,4 +12,9 @@ def home():
 @main.route("/test")
 def test():
     return "Test route works!"
-    
\ No newline at end of file
+
+@main.route("/map")
+def map_view():
+    gene = request.args.get("gene", "SPTAN1")
+    # The cached figure is already serialized; the template embeds it as-is
+    return render_template("map.html", gene=gene, graphJSON=generate_variant_map_json(gene))
@@ -1,10 +1,16 @@
+import functools
+
 import pandas as pd
-import plotly.express as px
+
+# Plotly is imported inside the functions that use it, so worker boots (and
+# routes that never draw a map) don't pay its import time and memory
 
 def generate_variant_map(gene: str):
     """
     Given a gene name, load its variant-effect data and return a Plotly figure.
     """
+    import plotly.express as px
+
     # TODO: replace with real dataset loading
     df = pd.DataFrame({
         "position": [1, 1, 2, 2, 3, 3],
@@ -21,3 +27,21 @@ def generate_variant_map(gene: str):
         title=f"Variant Effect Map for {gene}"
     )
     return fig
+
+@functools.lru_cache(maxsize=64)
+def generate_variant_map_json(gene: str) -> str:
+    """
+    Return the variant map for a gene as a serialized Plotly JSON string.
+
+    Cached per gene, so warm requests skip the DataFrame, figure build and
+    JSON encoding entirely. The figure is encoded with orjson, which writes
+    NumPy arrays in C. HTML-sensitive characters are escaped (as Jinja's
+    tojson does) so the string can be embedded in a <script> block.
+    """
+    import plotly.io as pio
+
+    graph_json = pio.to_json(generate_variant_map(gene), engine="orjson", validate=False)
+    return (graph_json.replace("<", "\\u003c")
+                      .replace(">", "\\u003e")
+                      .replace("&", "\\u0026")
+                      .replace("'", "\\u0027"))